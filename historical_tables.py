@@ -0,0 +1,235 @@
+"""
+HISTORICAL TABLES - Precomputed head-to-head, surface and form tables
+Offline build step: compiles local historical results into memory-mapped NumPy tables
+"""
+
+import csv
+import json
+import logging
+import os
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SURFACES = ['Hard', 'Clay', 'Grass', 'Carpet']
+FORM_WINDOW = 10
+
+DEFAULT_TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+
+PLAYERS_FILE = 'players.json'
+H2H_OFFSETS_FILE = 'h2h_offsets.npy'
+H2H_OPPONENTS_FILE = 'h2h_opponents.npy'
+H2H_WINS_FILE = 'h2h_wins.npy'
+SURFACE_FILE = 'surface.npy'
+FORM_FILE = 'form.npy'
+
+UINT16_MAX = np.iinfo(np.uint16).max
+
+
+def _player_key(row, side):
+    """Player key for a result row - the tennis_atp id, or the name if no id column"""
+    name = (row.get(f'{side}_name') or '').strip()
+    player_id = (row.get(f'{side}_id') or '').strip()
+    return (player_id or name), name
+
+
+def _save_atomic(out_dir, filename, write):
+    """Write to a temp file in out_dir, then os.replace it over filename
+
+    Replacing (rather than truncating) leaves the old inode intact for
+    workers that still have it memory-mapped.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{filename}.', dir=out_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        # mkstemp creates 0600 files - make them readable like a normal np.save
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(out_dir, filename))
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_tables(results_paths, out_dir=DEFAULT_TABLES_DIR):
+    """Compile historical results CSVs into compact NumPy tables
+
+    Each CSV needs tourney_date, surface, winner_id/winner_name and
+    loser_id/loser_name columns (the Tennis Abstract / tennis_atp results
+    layout). Players are keyed by id; a name shared by several ids resolves
+    to the most recently active one. Tables written, for n players and
+    m distinct (winner, loser) pairs:
+      h2h_offsets.npy    int64  [n + 1]    CSR row offsets into the two arrays below
+      h2h_opponents.npy  int32  [m]        beaten opponents, sorted within each row
+      h2h_wins.npy       uint16 [m]        wins of the row player over that opponent
+      surface.npy        uint16 [n, S, 2]  wins / losses per surface
+      form.npy           uint8  [n, 2]     wins / matches over the last FORM_WINDOW
+    H2H costs 8(n + 1) + 6m bytes instead of 2n^2 for a dense matrix - a few
+    MB for the full tennis_atp history rather than hundreds.
+    Files are swapped in with os.replace, players.json last.
+    """
+    results = []
+    for path in results_paths:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                winner, winner_name = _player_key(row, 'winner')
+                loser, loser_name = _player_key(row, 'loser')
+                if not winner or not loser:
+                    continue
+                try:
+                    match_num = int(row.get('match_num') or 0)
+                except ValueError:
+                    match_num = 0
+                results.append((row.get('tourney_date', ''), match_num, row.get('surface', ''),
+                                winner, winner_name, loser, loser_name))
+
+    # Chronological order so the form window sees the most recent matches last
+    results.sort(key=lambda r: (r[0], r[1]))
+
+    ids = sorted({r[3] for r in results} | {r[5] for r in results})
+    index = {player_id: i for i, player_id in enumerate(ids)}
+    n = len(ids)
+
+    pair_wins = Counter()
+    surface = np.zeros((n, len(SURFACES), 2), dtype=np.uint16)
+    recent = [[] for _ in range(n)]
+    names = {}
+
+    for _, _, surface_name, winner, winner_name, loser, loser_name in results:
+        wi = index[winner]
+        li = index[loser]
+
+        # Later results overwrite earlier ones, so shared names end on the latest player
+        if winner_name:
+            names[winner_name] = wi
+        if loser_name:
+            names[loser_name] = li
+
+        pair_wins[wi, li] += 1
+
+        if surface_name in SURFACES:
+            s = SURFACES.index(surface_name)
+            if surface[wi, s, 0] < UINT16_MAX:
+                surface[wi, s, 0] += 1
+            if surface[li, s, 1] < UINT16_MAX:
+                surface[li, s, 1] += 1
+
+        recent[wi].append(1)
+        recent[li].append(0)
+
+    # Sparse H2H in CSR layout: row i holds the opponents i has beaten
+    pairs = sorted(pair_wins)
+    h2h_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(h2h_offsets, np.array([wi + 1 for wi, _ in pairs], dtype=np.int64), 1)
+    h2h_offsets = np.cumsum(h2h_offsets)
+    h2h_opponents = np.array([li for _, li in pairs], dtype=np.int32)
+    h2h_wins = np.array([min(pair_wins[pair], UINT16_MAX) for pair in pairs], dtype=np.uint16)
+
+    form = np.zeros((n, 2), dtype=np.uint8)
+    for i, history in enumerate(recent):
+        window = history[-FORM_WINDOW:]
+        form[i, 0] = sum(window)
+        form[i, 1] = len(window)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for filename, array in [(H2H_OFFSETS_FILE, h2h_offsets), (H2H_OPPONENTS_FILE, h2h_opponents),
+                            (H2H_WINS_FILE, h2h_wins), (SURFACE_FILE, surface), (FORM_FILE, form)]:
+        _save_atomic(out_dir, filename, lambda f, array=array: np.save(f, array))
+
+    meta = {'ids': ids, 'names': names, 'surfaces': SURFACES, 'form_window': FORM_WINDOW}
+    _save_atomic(out_dir, PLAYERS_FILE, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+    logger.info(f"Built historical tables for {n} players ({len(pairs)} H2H pairs) "
+                f"from {len(results)} results in {out_dir}")
+    return n
+
+
+class HistoricalTables:
+    """Read-only view over tables produced by build_tables
+
+    Arrays are opened with mmap_mode='r', so nothing is parsed at startup and
+    worker processes share the same page cache instead of private copies.
+    """
+
+    def __init__(self, tables_dir=DEFAULT_TABLES_DIR):
+        with open(os.path.join(tables_dir, PLAYERS_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.ids = {player_id: i for i, player_id in enumerate(meta['ids'])}
+        self.index = meta['names']
+        self.surfaces = {name: i for i, name in enumerate(meta['surfaces'])}
+        self.form_window = meta['form_window']
+
+        self.h2h_offsets = np.load(os.path.join(tables_dir, H2H_OFFSETS_FILE), mmap_mode='r')
+        self.h2h_opponents = np.load(os.path.join(tables_dir, H2H_OPPONENTS_FILE), mmap_mode='r')
+        self.h2h_wins = np.load(os.path.join(tables_dir, H2H_WINS_FILE), mmap_mode='r')
+        self.surface = np.load(os.path.join(tables_dir, SURFACE_FILE), mmap_mode='r')
+        self.form = np.load(os.path.join(tables_dir, FORM_FILE), mmap_mode='r')
+
+        # Guard against mixing files from two different builds
+        n = len(self.ids)
+        if (self.h2h_offsets.shape != (n + 1,) or self.surface.shape[0] != n or self.form.shape[0] != n
+                or self.h2h_opponents.shape != self.h2h_wins.shape):
+            raise ValueError(f"Table shapes do not match players.json ({n} players)")
+
+    @classmethod
+    def load(cls, tables_dir=None):
+        """Load tables if they have been built, otherwise return None"""
+        tables_dir = tables_dir or os.environ.get('TENNIS_TABLES_DIR', DEFAULT_TABLES_DIR)
+        if not os.path.exists(os.path.join(tables_dir, PLAYERS_FILE)):
+            logger.info(f"No historical tables in {tables_dir}, using rank-only model")
+            return None
+        try:
+            tables = cls(tables_dir)
+            logger.info(f"Loaded historical tables for {len(tables.ids)} players")
+            return tables
+        except Exception as e:
+            logger.error(f"Error loading historical tables: {e}")
+            return None
+
+    def _wins(self, i, j):
+        """Wins of player i over player j from the CSR head-to-head arrays"""
+        start = int(self.h2h_offsets[i])
+        end = int(self.h2h_offsets[i + 1])
+        pos = start + int(np.searchsorted(self.h2h_opponents[start:end], j))
+        if pos < end and self.h2h_opponents[pos] == j:
+            return int(self.h2h_wins[pos])
+        return 0
+
+    def head_to_head(self, player1, player2):
+        """Return (player1 wins, player2 wins) against each other"""
+        i = self.index.get(player1)
+        j = self.index.get(player2)
+        if i is None or j is None:
+            return 0, 0
+        return self._wins(i, j), self._wins(j, i)
+
+    def surface_record(self, player, surface):
+        """Return (wins, losses) on a surface"""
+        i = self.index.get(player)
+        s = self.surfaces.get(surface)
+        if i is None or s is None:
+            return 0, 0
+        return int(self.surface[i, s, 0]), int(self.surface[i, s, 1])
+
+    def recent_form(self, player):
+        """Return (wins, matches) over the recent-form window"""
+        i = self.index.get(player)
+        if i is None:
+            return 0, 0
+        return int(self.form[i, 0]), int(self.form[i, 1])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) < 2:
+        print(f"Usage: python {os.path.basename(__file__)} RESULTS_CSV [RESULTS_CSV ...]")
+        print(f"Tables are written to $TENNIS_TABLES_DIR (default: {DEFAULT_TABLES_DIR})")
+        sys.exit(1)
+
+    build_tables(sys.argv[1:], os.environ.get('TENNIS_TABLES_DIR', DEFAULT_TABLES_DIR))
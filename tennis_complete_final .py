@@ -9,12 +9,19 @@ import re
 import json
 from datetime import datetime, timedelta
 import logging
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import random
 import threading
 import time
 import os
+import gzip
+from historical_tables import HistoricalTables
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,6 +37,12 @@ class CompleteTennisBettingSystem:
         self.cached_tournaments = []
         self.last_update = None
         
+        # Serialized endpoint payloads with gzip / brotli variants, rebuilt once per refresh
+        self.response_variants = {}
+        
+        # Precomputed H2H / surface / form tables (memory-mapped, built offline)
+        self.historical_tables = HistoricalTables.load()
+        
         # Real player database with rankings
         self.real_players = {
             # ATP Top Players
@@ -240,7 +253,9 @@ class CompleteTennisBettingSystem:
                 player2_data = self.real_players[player2_name]
                 
                 # Calculate realistic probabilities
-                prob_data = self.calculate_realistic_probabilities(player1_data, player2_data, tournament)
+                prob_data = self.calculate_realistic_probabilities(
+                    player1_data, player2_data, tournament, player1_name, player2_name
+                )
                 
                 # Determine round
                 rounds = ['R32', 'R16', 'QF', 'SF', 'F']
@@ -286,7 +301,8 @@ class CompleteTennisBettingSystem:
         logger.info(f"Generated {len(all_matches)} realistic matches")
         return all_matches
     
-    def calculate_realistic_probabilities(self, player1_data, player2_data, tournament):
+    def calculate_realistic_probabilities(self, player1_data, player2_data, tournament,
+                                          player1_name=None, player2_name=None):
         """Calculate realistic match probabilities"""
         try:
             rank1 = player1_data['rank']
@@ -321,8 +337,11 @@ class CompleteTennisBettingSystem:
             elif 24 <= age2 <= 28 and not (24 <= age1 <= 28):
                 age_adj -= 0.05
             
+            # Historical adjustments (H2H, surface win rate, recent form)
+            history_adj = self.calculate_history_adjustment(player1_name, player2_name, surface)
+            
             # Final probability
-            player1_prob = max(0.1, min(0.9, expected_score + surface_adj + age_adj))
+            player1_prob = max(0.1, min(0.9, expected_score + surface_adj + age_adj + history_adj))
             player2_prob = 1 - player1_prob
             
             confidence = abs(player1_prob - 0.5) + 0.2
@@ -337,6 +356,32 @@ class CompleteTennisBettingSystem:
             logger.error(f"Error calculating probabilities: {e}")
             return {'player1_prob': 0.5, 'player2_prob': 0.5, 'confidence': 0.5}
     
+    def calculate_history_adjustment(self, player1_name, player2_name, surface):
+        """Probability adjustment from precomputed historical tables"""
+        tables = self.historical_tables
+        if tables is None or not player1_name or not player2_name:
+            return 0.0
+        
+        # Head-to-head (smoothed towards 50% for small samples)
+        h2h1, h2h2 = tables.head_to_head(player1_name, player2_name)
+        h2h_adj = ((h2h1 + 1) / (h2h1 + h2h2 + 2) - 0.5) * 0.2
+        
+        # Surface-specific win rates
+        wins1, losses1 = tables.surface_record(player1_name, surface)
+        wins2, losses2 = tables.surface_record(player2_name, surface)
+        surface_rate1 = (wins1 + 1) / (wins1 + losses1 + 2)
+        surface_rate2 = (wins2 + 1) / (wins2 + losses2 + 2)
+        surface_adj = (surface_rate1 - surface_rate2) * 0.15
+        
+        # Recent form window
+        form_wins1, form_played1 = tables.recent_form(player1_name)
+        form_wins2, form_played2 = tables.recent_form(player2_name)
+        form1 = (form_wins1 + 1) / (form_played1 + 2)
+        form2 = (form_wins2 + 1) / (form_played2 + 2)
+        form_adj = (form1 - form2) * 0.1
+        
+        return h2h_adj + surface_adj + form_adj
+    
     def calculate_enhanced_edge(self, match, tournament):
         """Calculate enhanced betting edge with advanced model"""
         try:
@@ -425,9 +470,15 @@ class CompleteTennisBettingSystem:
             # Get real tournaments
             tournaments = self.get_real_tournaments()
             
+            # Keep the fallback list too, so the snapshot matches the generated matches
+            self.cached_tournaments = tournaments
+            
             # Generate realistic matches
             matches = self.generate_realistic_matches(tournaments)
             
+            # Precompress endpoint payloads for this snapshot
+            self.build_response_variants()
+            
             return {
                 'tournaments': tournaments,
                 'matches': matches,
@@ -438,6 +489,81 @@ class CompleteTennisBettingSystem:
             logger.error(f"Error getting current data: {e}")
             return {'tournaments': [], 'matches': [], 'stats': {}}
     
+    def build_daily_predictions_payload(self):
+        """Build /api/daily-predictions payload from cached matches"""
+        matches = self.cached_matches
+        
+        # Return top matches (sorted by edge)
+        top_matches = matches[:15]
+        
+        formatted_matches = []
+        for match in top_matches:
+            formatted_match = {
+                'tournament': match['tournament'],
+                'level': match['level'],
+                'surface': match['surface'],
+                'location': match['location'],
+                'round': match.get('round', 'Unknown'),
+                'player1': match['player1'],
+                'player2': match['player2'],
+                'player1_win_probability': round(match['player1_win_probability'] * 100, 1),
+                'player2_win_probability': round(match['player2_win_probability'] * 100, 1),
+                'confidence': round(match['confidence'] * 100, 1),
+                'enhanced_edge': match.get('enhanced_edge', 0),
+                'level_multiplier': match.get('level_multiplier', 1.0),
+                'rank_multiplier': match.get('rank_multiplier', 1.0),
+                'surface_multiplier': match.get('surface_multiplier', 1.0),
+                'challenger_level': match.get('challenger_level', False),
+                'is_value_bet': match.get('is_value_bet', False),
+                'bet_strength': match.get('bet_strength', 'Low'),
+                'date': match['date']
+            }
+            formatted_matches.append(formatted_match)
+        
+        return {
+            'matches': formatted_matches,
+            'total_available': len(matches),
+            'value_bets_found': len([m for m in matches if m.get('is_value_bet', False)]),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def build_tournaments_payload(self):
+        """Build /api/tournaments payload from cached tournaments"""
+        tournaments = self.cached_tournaments
+        return {
+            'tournaments': tournaments,
+            'count': len(tournaments),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def compress_payload(self, payload):
+        """Serialize payload once and return identity / gzip / brotli variants"""
+        # Same bytes as jsonify: sorted keys, compact separators, trailing newline
+        body = (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        variants = {
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0)
+        }
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=11, mode=brotli.MODE_TEXT)
+        
+        # Tiny payloads can grow when compressed - only keep variants that shrink
+        return {enc: data for enc, data in variants.items() if enc == 'identity' or len(data) < len(body)}
+    
+    def build_response_variants(self):
+        """Precompress endpoint payloads for the current snapshot"""
+        try:
+            # Swap in a new dict so requests never see a half-built snapshot
+            self.response_variants = {
+                'daily-predictions': self.compress_payload(self.build_daily_predictions_payload()),
+                'tournaments': self.compress_payload(self.build_tournaments_payload())
+            }
+            sizes = {name: {enc: len(body) for enc, body in v.items()} for name, v in self.response_variants.items()}
+            logger.info(f"Built response variants: {sizes}")
+        except Exception as e:
+            # Keep serving the previous good snapshot
+            logger.error(f"Error building response variants: {e}")
+    
     def get_system_stats(self):
         """Get system statistics"""
         matches = self.cached_matches
@@ -507,63 +633,39 @@ def health():
         'model_loaded': True
     })
 
+def precompressed_response(name, build_payload):
+    """Serve a precompressed payload variant chosen by Accept-Encoding"""
+    variants = tennis_system.response_variants.get(name)
+    if not variants:
+        # No snapshot yet - serve uncompressed rather than compressing per request
+        return jsonify(build_payload())
+    
+    # Highest client q-value wins; ties go to brotli, then gzip
+    candidates = [enc for enc in ('br', 'gzip', 'identity') if enc in variants]
+    encoding = request.accept_encodings.best_match(candidates, default='identity')
+    
+    response = Response(variants[encoding], mimetype='application/json')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/api/daily-predictions')
 def daily_predictions():
     """Get daily predictions with enhanced data"""
-    matches = tennis_system.cached_matches
-    
-    if not matches:
+    if not tennis_system.cached_matches:
         # Load fresh data
-        data = tennis_system.get_all_current_data()
-        matches = data['matches']
-    
-    # Return top matches (sorted by edge)
-    top_matches = matches[:15]
-    
-    formatted_matches = []
-    for match in top_matches:
-        formatted_match = {
-            'tournament': match['tournament'],
-            'level': match['level'],
-            'surface': match['surface'],
-            'location': match['location'],
-            'round': match.get('round', 'Unknown'),
-            'player1': match['player1'],
-            'player2': match['player2'],
-            'player1_win_probability': round(match['player1_win_probability'] * 100, 1),
-            'player2_win_probability': round(match['player2_win_probability'] * 100, 1),
-            'confidence': round(match['confidence'] * 100, 1),
-            'enhanced_edge': match.get('enhanced_edge', 0),
-            'level_multiplier': match.get('level_multiplier', 1.0),
-            'rank_multiplier': match.get('rank_multiplier', 1.0),
-            'surface_multiplier': match.get('surface_multiplier', 1.0),
-            'challenger_level': match.get('challenger_level', False),
-            'is_value_bet': match.get('is_value_bet', False),
-            'bet_strength': match.get('bet_strength', 'Low'),
-            'date': match['date']
-        }
-        formatted_matches.append(formatted_match)
+        tennis_system.get_all_current_data()
     
-    return jsonify({
-        'matches': formatted_matches,
-        'total_available': len(matches),
-        'value_bets_found': len([m for m in matches if m.get('is_value_bet', False)]),
-        'timestamp': datetime.now().isoformat()
-    })
+    return precompressed_response('daily-predictions', tennis_system.build_daily_predictions_payload)
 
 @app.route('/api/tournaments')
 def tournaments():
     """Get current tournaments"""
-    tournaments = tennis_system.cached_tournaments
-    
-    if not tournaments:
-        tournaments = tennis_system.get_real_tournaments()
+    if not tennis_system.cached_tournaments:
+        tennis_system.cached_tournaments = tennis_system.get_real_tournaments()
     
-    return jsonify({
-        'tournaments': tournaments,
-        'count': len(tournaments),
-        'timestamp': datetime.now().isoformat()
-    })
+    return precompressed_response('tournaments', tennis_system.build_tournaments_payload)
 
 @app.route('/api/players')
 def players():
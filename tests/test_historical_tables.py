@@ -0,0 +1,108 @@
+import csv
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from historical_tables import HistoricalTables, build_tables  # noqa: E402
+
+RESULTS = [
+    # tourney_date, match_num, surface, winner_id, winner_name, loser_id, loser_name
+    ('20240101', 1, 'Hard', '1', 'Carlos Alcaraz', '2', 'Jannik Sinner'),
+    ('20240102', 2, 'Clay', '2', 'Jannik Sinner', '1', 'Carlos Alcaraz'),
+    ('20240103', 3, 'Clay', '1', 'Carlos Alcaraz', '3', 'Alex Molcan'),
+    ('20240104', 4, 'Hard', '1', 'Carlos Alcaraz', '2', 'Jannik Sinner'),
+]
+
+
+def write_results(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['tourney_date', 'match_num', 'surface', 'winner_id', 'winner_name', 'loser_id', 'loser_name'])
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def tables(tmp_path):
+    results = tmp_path / 'results.csv'
+    write_results(results, RESULTS)
+    build_tables([str(results)], str(tmp_path / 'tables'))
+    return HistoricalTables.load(str(tmp_path / 'tables'))
+
+
+def test_round_trip(tables):
+    assert tables.head_to_head('Carlos Alcaraz', 'Jannik Sinner') == (2, 1)
+    assert tables.head_to_head('Jannik Sinner', 'Carlos Alcaraz') == (1, 2)
+    assert tables.head_to_head('Jannik Sinner', 'Alex Molcan') == (0, 0)
+    assert tables.surface_record('Carlos Alcaraz', 'Clay') == (1, 1)
+    assert tables.surface_record('Carlos Alcaraz', 'Hard') == (2, 0)
+    assert tables.recent_form('Carlos Alcaraz') == (3, 4)
+    assert tables.recent_form('Alex Molcan') == (0, 1)
+
+
+def test_unknown_player(tables):
+    assert tables.head_to_head('Carlos Alcaraz', 'Nobody') == (0, 0)
+    assert tables.surface_record('Nobody', 'Clay') == (0, 0)
+    assert tables.recent_form('Nobody') == (0, 0)
+
+
+def test_players_keyed_by_id(tmp_path):
+    # Two different players share a name - they must not be merged
+    rows = RESULTS + [
+        ('20240105', 5, 'Grass', '4', 'Alex Molcan', '2', 'Jannik Sinner'),
+    ]
+    results = tmp_path / 'results.csv'
+    write_results(results, rows)
+    build_tables([str(results)], str(tmp_path / 'tables'))
+    tables = HistoricalTables.load(str(tmp_path / 'tables'))
+
+    assert len(tables.ids) == 4
+    # The name resolves to the most recently active player
+    assert tables.recent_form('Alex Molcan') == (1, 1)
+    assert tables.head_to_head('Alex Molcan', 'Carlos Alcaraz') == (0, 0)
+
+
+def test_rebuild_replaces_files(tmp_path, tables):
+    old = tables.head_to_head('Carlos Alcaraz', 'Jannik Sinner')
+    results = tmp_path / 'results.csv'
+    write_results(results, RESULTS[:1])
+    build_tables([str(results)], str(tmp_path / 'tables'))
+
+    # Mapped tables keep reading the old build, a fresh load sees the new one
+    assert tables.head_to_head('Carlos Alcaraz', 'Jannik Sinner') == old
+    assert HistoricalTables.load(str(tmp_path / 'tables')).head_to_head('Carlos Alcaraz', 'Jannik Sinner') == (1, 0)
+    assert sorted(os.listdir(tmp_path / 'tables')) == sorted([
+        'players.json', 'h2h_offsets.npy', 'h2h_opponents.npy', 'h2h_wins.npy', 'surface.npy', 'form.npy'
+    ])
+
+
+def load_app(monkeypatch, tables_dir):
+    monkeypatch.setenv('TENNIS_TABLES_DIR', tables_dir)
+    spec = importlib.util.spec_from_file_location('tennis_complete_final', os.path.join(ROOT, 'tennis_complete_final .py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_model_falls_back_without_tables(monkeypatch, tmp_path):
+    system = load_app(monkeypatch, str(tmp_path / 'missing')).CompleteTennisBettingSystem()
+    assert system.historical_tables is None
+
+    tournament = {'surface': 'Hard'}
+    player1 = system.real_players['Carlos Alcaraz']
+    player2 = system.real_players['Jannik Sinner']
+    with_names = system.calculate_realistic_probabilities(player1, player2, tournament, 'Carlos Alcaraz', 'Jannik Sinner')
+    rank_only = system.calculate_realistic_probabilities(player1, player2, tournament)
+    assert with_names == rank_only
+    assert system.calculate_history_adjustment('Carlos Alcaraz', 'Jannik Sinner', 'Hard') == 0.0
+
+
+def test_model_uses_tables(monkeypatch, tmp_path, tables):
+    system = load_app(monkeypatch, str(tmp_path / 'tables')).CompleteTennisBettingSystem()
+    assert system.historical_tables is not None
+    assert system.calculate_history_adjustment('Carlos Alcaraz', 'Jannik Sinner', 'Hard') > 0
+    assert system.calculate_history_adjustment('Jannik Sinner', 'Carlos Alcaraz', 'Hard') < 0
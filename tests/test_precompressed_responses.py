@@ -0,0 +1,87 @@
+import gzip
+import importlib.util
+import json
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app_module(monkeypatch, tmp_path):
+    monkeypatch.setenv('TENNIS_TABLES_DIR', str(tmp_path / 'missing'))
+    monkeypatch.syspath_prepend(ROOT)
+    spec = importlib.util.spec_from_file_location('tennis_complete_final', os.path.join(ROOT, 'tennis_complete_final .py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # Simulate the network / page parse failing so the fallback list is used
+    system = module.tennis_system
+    monkeypatch.setattr(system, 'get_real_tournaments', system.get_fallback_tournaments)
+    return module
+
+
+def decode(response):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    if encoding == 'br':
+        brotli = pytest.importorskip('brotli')
+        return brotli.decompress(response.data)
+    return response.data
+
+
+def test_snapshot_uses_fallback_tournaments(app_module):
+    app_module.tennis_system.get_all_current_data()
+    response = app_module.app.test_client().get('/api/tournaments', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(decode(response))['count'] == len(app_module.tennis_system.get_fallback_tournaments())
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip', 'gzip'),
+    ('br;q=0.1, gzip;q=1.0', 'gzip'),
+    ('gzip;q=0', None),
+    ('', None),
+])
+def test_accept_encoding_negotiation(app_module, accept, expected):
+    app_module.tennis_system.get_all_current_data()
+    response = app_module.app.test_client().get('/api/daily-predictions', headers={'Accept-Encoding': accept})
+
+    assert response.headers.get('Content-Encoding') == expected
+    assert json.loads(decode(response))['total_available'] == len(app_module.tennis_system.cached_matches)
+
+
+def test_brotli_preferred_on_tie(app_module):
+    pytest.importorskip('brotli')
+    app_module.tennis_system.get_all_current_data()
+    response = app_module.app.test_client().get('/api/daily-predictions', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+
+
+def test_variant_bytes_match_jsonify(app_module):
+    system = app_module.tennis_system
+    system.get_all_current_data()
+    payload = system.build_tournaments_payload()
+
+    with app_module.app.app_context():
+        expected = app_module.jsonify(payload).get_data()
+    assert system.compress_payload(payload)['identity'] == expected
+
+
+def test_failed_build_keeps_previous_snapshot(app_module, monkeypatch):
+    system = app_module.tennis_system
+    system.get_all_current_data()
+    previous = system.response_variants
+
+    def fail():
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(system, 'build_tournaments_payload', fail)
+    system.build_response_variants()
+
+    assert system.response_variants is previous